@@ -1,10 +1,8 @@
-import asyncio
-import copy
-import json
-from collections.abc import AsyncGenerator
 from fastapi import FastAPI, Request
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.responses import StreamingResponse
+from jsonio import read_json
+from sse import SSEBroker
 
 app = FastAPI(title="Cross Product API", version="1.0.0")
 
@@ -19,7 +17,7 @@ app.add_middleware(
 
 current_level_obj = None
 original_level_obj = None
-_subscribers: set[asyncio.Queue[tuple[str, dict]]] = set()
+_events = SSEBroker()
 
 
 # game_info = {
@@ -34,35 +32,11 @@ _subscribers: set[asyncio.Queue[tuple[str, dict]]] = set()
 # }
 
 def _publish(event: str, data: dict) -> None:
-    for queue in list(_subscribers):
-        try:
-            queue.put_nowait((event, data))
-        except Exception:
-            # Best-effort; drop if enqueue fails
-            pass
+    _events.publish(event, data)
 
 @app.get("/events")
 async def sse_stream() -> StreamingResponse:
-    queue: asyncio.Queue[tuple[str, dict]] = asyncio.Queue()
-    _subscribers.add(queue)
-    # Immediately replay the current grid to the new subscriber, if available
-    try:
-        if current_level_obj is not None:
-            queue.put_nowait(("level", current_level_obj))
-    except Exception:
-        pass
-
-    async def event_generator() -> AsyncGenerator[str, None]:
-        try:
-            # Initial comment to open the stream
-            yield ": connected\n\n"
-            while True:
-                event, data = await queue.get()
-                yield f"event: {event}\ndata: {json.dumps(data)}\n\n"
-        finally:
-            _subscribers.discard(queue)
-
-    return StreamingResponse(event_generator(), media_type="text/event-stream")
+    return _events.stream()
 
 
 @app.get("/health")
@@ -71,14 +45,14 @@ async def health_check():
 
 @app.post("/levels/{level_id}")
 async def get_level(level_id: str, request: Request):
-    request_body = await request.json()
+    request_body = await read_json(request)
     game_info = request_body["game_info"]
 
     global current_level_obj, original_level_obj
-    # Deep copy the board for original state
-    original_game_info = copy.deepcopy(game_info)
     level_data = {"game_info": game_info, "level_id": level_id}
-    original_level_data = {"game_info": original_game_info, "level_id": level_id}
+    # Handlers only write board cells, so immutable rows are enough to reset from
+    original_board = tuple(tuple(row) for row in game_info["board"])
+    original_level_data = {"game_info": {**game_info, "board": original_board}, "level_id": level_id}
     
     current_level_obj = level_data
     original_level_obj = original_level_data
@@ -89,7 +63,7 @@ async def get_level(level_id: str, request: Request):
 
 @app.post("/place")
 async def place_number(request: Request):
-    request_body = await request.json()
+    request_body = await read_json(request)
     row = request_body["row"]
     col = request_body["col"]
     number = request_body["number"]
@@ -123,7 +97,7 @@ async def place_number(request: Request):
 
 @app.post("/erase")
 async def erase_number(request: Request):
-    request_body = await request.json()
+    request_body = await read_json(request)
     row = request_body["row"]
     col = request_body["col"]
 
@@ -161,8 +135,9 @@ async def reset_board():
     if original_level_obj is None:
         return {"success": False, "message": "No original level to reset to"}
 
-    # Deep copy the original board
-    reset_game_info = copy.deepcopy(original_level_obj["game_info"])
+    # Rebuild mutable rows from the original snapshot
+    original_game_info = original_level_obj["game_info"]
+    reset_game_info = {**original_game_info, "board": [list(row) for row in original_game_info["board"]]}
     current_level_obj = {
         "game_info": reset_game_info,
         "level_id": original_level_obj["level_id"]
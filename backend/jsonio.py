@@ -0,0 +1,29 @@
+"""
+JSON helpers that use orjson when it is installed.
+"""
+
+import json
+from typing import Any
+from fastapi import Request
+
+try:
+    import orjson
+except ImportError:  # Optional speedup; fall back to the stdlib encoder
+    orjson = None
+
+
+def dumps(data: Any) -> bytes:
+    if orjson is not None:
+        return orjson.dumps(data)
+    return json.dumps(data, separators=(",", ":")).encode()
+
+
+def loads(payload: bytes) -> Any:
+    if orjson is not None:
+        return orjson.loads(payload)
+    return json.loads(payload)
+
+
+async def read_json(request: Request) -> Any:
+    """Parse the request body with orjson when it is installed."""
+    return loads(await request.body())
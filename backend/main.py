@@ -1,10 +1,9 @@
-import asyncio
-import copy
-import json
-from collections.abc import AsyncGenerator
+from collections import deque
 from fastapi import FastAPI, Request
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.responses import StreamingResponse
+from jsonio import read_json
+from sse import SSEBroker
 
 app = FastAPI(title="Cross Product API", version="1.0.0")
 
@@ -20,53 +19,36 @@ app.add_middleware(
 current_level_obj = None
 original_level_obj = None
 pentonimo_letters = ["F", "I", "L", "P", "N", "T", "U", "V", "W", "X", "Y", "Z"]
-_subscribers: set[asyncio.Queue[tuple[str, dict]]] = set()
+_events = SSEBroker()
 
 EMPTY_TILE = "-"
 SELECTED_TILE = "*"
 BLOCKED_TILE = "|"
 
 def _publish(event: str, data: dict) -> None:
-    for queue in list(_subscribers):
-        try:
-            queue.put_nowait((event, data))
-        except Exception:
-            # Best-effort; drop if enqueue fails
-            pass
+    _events.publish(event, data)
 
 
 def _is_selection_valid(board: list[list[str]], coords: list[tuple[int, int]]) -> bool:
-    if len(coords) != 5:
-        return False
-
-    coords_set = set(coords)
-    if len(coords_set) != 5:
-        return False
-
     rows = len(board)
     cols = len(board[0]) if rows else 0
 
-    for row, col in coords_set:
+    for row, col in coords:
         if row < 0 or row >= rows or col < 0 or col >= cols:
             return False
         if board[row][col] != SELECTED_TILE:
             return False
 
-    stack: list[tuple[int, int]] = [next(iter(coords_set))]
-    visited: set[tuple[int, int]] = set()
-    directions = ((1, 0), (-1, 0), (0, 1), (0, -1))
+    return _selection_letter(coords) is not None
 
-    while stack:
-        r, c = stack.pop()
-        if (r, c) in visited:
-            continue
-        visited.add((r, c))
-        for dr, dc in directions:
-            neighbor = (r + dr, c + dc)
-            if neighbor in coords_set and neighbor not in visited:
-                stack.append(neighbor)
 
-    return len(visited) == len(coords_set)
+def _selection_letter(coords: list[tuple[int, int]]) -> str | None:
+    """Return the pentomino letter the selected cells form, or None."""
+    if len(coords) != 5:
+        return None
+    # Duplicate cells pack into fewer than 5 bits, and every connected 5-cell
+    # shape is a pentomino orientation, so one bitmask lookup checks both
+    return _CANONICAL_TO_LETTER.get(_shape_key(coords))
 
 
 def _transformations(coords: list[tuple[int, int]]) -> set[tuple[tuple[int, int], ...]]:
@@ -87,17 +69,31 @@ def _transformations(coords: list[tuple[int, int]]) -> set[tuple[tuple[int, int]
 
                 transformed.append((r, c))
 
-            min_row = min(r for r, _ in transformed)
-            min_col = min(c for _, c in transformed)
-            normalized = tuple(sorted((r - min_row, c - min_col) for r, c in transformed))
-            results.add(normalized)
+            results.add(_normalize(transformed))
 
     return results
 
 
-def _canonical(coords: list[tuple[int, int]]) -> tuple[tuple[int, int], ...]:
-    """Return the canonical (lexicographically smallest) representation."""
-    return min(_transformations(coords))
+def _normalize(coords: list[tuple[int, int]]) -> tuple[tuple[int, int], ...]:
+    """Shift a coordinate set so its bounding box starts at (0, 0)."""
+    min_row = min(r for r, _ in coords)
+    min_col = min(c for _, c in coords)
+    return tuple(sorted((r - min_row, c - min_col) for r, c in coords))
+
+
+def _shape_key(coords: list[tuple[int, int]]) -> int:
+    """Pack origin-shifted cells into a 5x5 bitmask key for _CANONICAL_TO_LETTER."""
+    min_row = min(r for r, _ in coords)
+    min_col = min(c for _, c in coords)
+    mask = 0
+    for r, c in coords:
+        r -= min_row
+        c -= min_col
+        if r >= 5 or c >= 5:
+            # Too spread out to be a pentomino; 0 is never a table key
+            return 0
+        mask |= 1 << (r * 5 + c)
+    return mask
 
 
 def _clear_pentomino_cluster(board: list[list[str]], start_row: int, start_col: int) -> bool:
@@ -111,35 +107,30 @@ def _clear_pentomino_cluster(board: list[list[str]], start_row: int, start_col:
     if letter not in pentonimo_letters:
         return False
 
-    stack = [(start_row, start_col)]
-    visited: set[tuple[int, int]] = set()
-    directions = ((1, 0), (-1, 0), (0, 1), (0, -1))
-
-    cleared_positions: list[tuple[int, int]] = []
+    # Mark cells when enqueued so none is visited twice; stop once the
+    # cluster is too big to be a single pentomino
+    queue = deque([(start_row, start_col)])
+    visited: set[tuple[int, int]] = {(start_row, start_col)}
+
+    while queue and len(visited) <= 5:
+        r, c = queue.popleft()
+        for nr, nc in ((r - 1, c), (r + 1, c), (r, c - 1), (r, c + 1)):
+            if (
+                0 <= nr < rows
+                and 0 <= nc < cols
+                and board[nr][nc] == letter
+                and (nr, nc) not in visited
+            ):
+                visited.add((nr, nc))
+                queue.append((nr, nc))
+
+    # Only clear the tiles if the cluster is exactly one pentomino
+    if len(visited) != 5:
+        return False
 
-    while stack:
-        r, c = stack.pop()
-        if (r, c) in visited:
-            continue
-        if board[r][c] != letter:
-            continue
-        visited.add((r, c))
+    for r, c in visited:
         board[r][c] = EMPTY_TILE
-        cleared_positions.append((r, c))
-
-        for dr, dc in directions:
-            nr, nc = r + dr, c + dc
-            if 0 <= nr < rows and 0 <= nc < cols and (nr, nc) not in visited:
-                if board[nr][nc] == letter:
-                    stack.append((nr, nc))
-
-    if len(visited) == 5:
-        return True
-
-    # Restore the tiles if we didn't clear exactly one pentomino
-    for r, c in cleared_positions:
-        board[r][c] = letter
-    return False
+    return True
 
 
 _PENTOMINO_BASE_SHAPES = {
@@ -158,34 +149,15 @@ _PENTOMINO_BASE_SHAPES = {
 }
 
 # Build dictionary mapping all transformations of each pentomino to its letter
-_CANONICAL_TO_LETTER: dict[tuple[tuple[int, int], ...], str] = {}
+_CANONICAL_TO_LETTER: dict[int, str] = {}
 for letter, shape in _PENTOMINO_BASE_SHAPES.items():
     # Add all transformations of this shape to the dictionary
     for transform in _transformations(shape):
-        _CANONICAL_TO_LETTER[transform] = letter
+        _CANONICAL_TO_LETTER[_shape_key(list(transform))] = letter
 
 @app.get("/events")
 async def sse_stream() -> StreamingResponse:
-    queue: asyncio.Queue[tuple[str, dict]] = asyncio.Queue()
-    _subscribers.add(queue)
-    # Immediately replay the current grid to the new subscriber, if available
-    try:
-        if current_level_obj is not None:
-            queue.put_nowait(("level", current_level_obj))
-    except Exception:
-        pass
-
-    async def event_generator() -> AsyncGenerator[str, None]:
-        try:
-            # Initial comment to open the stream
-            yield ": connected\n\n"
-            while True:
-                event, data = await queue.get()
-                yield f"event: {event}\ndata: {json.dumps(data)}\n\n"
-        finally:
-            _subscribers.discard(queue)
-
-    return StreamingResponse(event_generator(), media_type="text/event-stream")
+    return _events.stream()
 
 
 @app.get("/health")
@@ -194,15 +166,15 @@ async def health_check():
 
 @app.post("/levels/{level_id}")
 async def get_level(level_id: str, request: Request):
-    request_body = await request.json()
+    request_body = await read_json(request)
     game_info = request_body["game_info"]
 
     global current_level_obj, original_level_obj
-    # Deep copy the board for original state
-    original_game_info = copy.deepcopy(game_info)
     level_data = {"game_info": game_info, "level_id": level_id}
-    original_level_data = {"game_info": original_game_info, "level_id": level_id}
-    
+    # Handlers only write board cells, so immutable rows are enough to reset from
+    original_board = tuple(tuple(row) for row in game_info["board"])
+    original_level_data = {"game_info": {**game_info, "board": original_board}, "level_id": level_id}
+
     current_level_obj = level_data
     original_level_obj = original_level_data
 
@@ -212,7 +184,7 @@ async def get_level(level_id: str, request: Request):
 
 @app.post("/select")
 async def select_tile(request: Request):
-    request_body = await request.json()
+    request_body = await read_json(request)
     row = request_body["row"]
     col = request_body["col"]
 
@@ -232,7 +204,7 @@ async def select_tile(request: Request):
     # Selecting an empty tile
     if current_value == EMPTY_TILE:
         # Count currently selected tiles on the board
-        selected_count = sum(1 for row_data in board for cell in row_data if cell == SELECTED_TILE)
+        selected_count = sum(row_data.count(SELECTED_TILE) for row_data in board)
         if selected_count >= 5:
             return {
                 "success": False,
@@ -275,32 +247,21 @@ async def lock_pentomino():
     # Build selection from board state
     current_selection = []
     for row_idx, row in enumerate(board):
+        # Skip rows without a selection using a C-level scan
+        if SELECTED_TILE not in row:
+            continue
         for col_idx, cell in enumerate(row):
             if cell == SELECTED_TILE:
-                # Ensure coordinates are integers
-                current_selection.append((int(row_idx), int(col_idx)))
+                current_selection.append((row_idx, col_idx))
 
-    if not _is_selection_valid(board, current_selection):
+    # The cells come from the board itself, so bounds and marks already hold
+    letter = _selection_letter(current_selection)
+    if letter is None:
         return {
             "success": False,
             "message": "Exactly 5 connected tiles must be selected to lock",
         }
 
-    canonical_form = _canonical(current_selection)
-    letter = _CANONICAL_TO_LETTER.get(canonical_form)
-    if letter is None:
-        # Debug: log what we got
-        print(f"DEBUG: Selection: {current_selection}")
-        print(f"DEBUG: Canonical: {canonical_form}")
-        print(f"DEBUG: In dict: {canonical_form in _CANONICAL_TO_LETTER}")
-        print(f"DEBUG: Dict size: {len(_CANONICAL_TO_LETTER)}")
-        # Check if it's a type issue
-        if isinstance(canonical_form, tuple):
-            print(f"DEBUG: Canonical is tuple, checking if any similar keys exist...")
-            for key in list(_CANONICAL_TO_LETTER.keys())[:3]:
-                print(f"DEBUG: Sample key: {key}, type: {type(key)}")
-        return {"success": False, "message": "Selected tiles do not form a valid pentomino"}
-
     for row, col in current_selection:
         board[row][col] = letter
 
@@ -310,7 +271,7 @@ async def lock_pentomino():
 
 @app.post("/unlock")
 async def unlock_pentomino(request: Request):
-    request_body = await request.json()
+    request_body = await read_json(request)
     row = request_body["row"]
     col = request_body["col"]
 
@@ -342,12 +303,13 @@ async def unlock_pentomino(request: Request):
 @app.post("/reset")
 async def reset_board():
     global current_level_obj, original_level_obj
-    
+
     if original_level_obj is None:
         return {"success": False, "message": "No original level to reset to"}
 
-    # Deep copy the original board
-    reset_game_info = copy.deepcopy(original_level_obj["game_info"])
+    # Rebuild mutable rows from the original snapshot
+    original_game_info = original_level_obj["game_info"]
+    reset_game_info = {**original_game_info, "board": [list(row) for row in original_game_info["board"]]}
     current_level_obj = {
         "game_info": reset_game_info,
         "level_id": original_level_obj["level_id"]
@@ -368,8 +330,7 @@ async def verify(request: Request):
     board = game_info["board"]
 
     for row in board:
-        for val in row:
-            if val == EMPTY_TILE or val == SELECTED_TILE:
-                return {"success": False, "message": "Board contains unplaced cells"}
+        if EMPTY_TILE in row or SELECTED_TILE in row:
+            return {"success": False, "message": "Board contains unplaced cells"}
 
     return {"success": True, "message": "Level verified successfully"}
\ No newline at end of file
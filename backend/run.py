@@ -2,6 +2,10 @@
 """
 Simple script to run the FastAPI backend server.
 Usage: python run.py
+
+Install uvicorn with `pip install "uvicorn[standard]"` to get uvloop and the
+httptools parser; uvicorn uses them automatically when present and falls back
+to asyncio/h11 otherwise (e.g. on Windows, where uvloop is unavailable).
 """
 
 import uvicorn
@@ -0,0 +1,81 @@
+"""
+Server-sent event fan-out shared by the game backends.
+"""
+
+import asyncio
+from collections.abc import AsyncGenerator
+from fastapi.responses import StreamingResponse
+from jsonio import dumps
+
+# Idle streams get a comment line this often so proxies don't time them out
+KEEPALIVE_INTERVAL = 15.0
+_KEEPALIVE_FRAME = b": ping\n\n"
+_SSE_HEADERS = {"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+
+
+def _format_event(event: str, data: dict) -> bytes:
+    return b"event: " + event.encode() + b"\ndata: " + dumps(data) + b"\n\n"
+
+
+class SSEBroker:
+    """Broadcast the latest value of each event to every open /events stream.
+
+    Every event carries a full snapshot, so subscribers only ever need the
+    newest one. Instead of a queue per subscriber, the broker keeps the latest
+    ``(seq, data)`` per event name and wakes all streams through one shared
+    ``asyncio.Event``; each stream sends whatever is newer than what it has seen.
+    """
+
+    def __init__(self) -> None:
+        self._seq = 0
+        self._latest: dict[str, tuple[int, dict]] = {}
+        self._frames: dict[str, bytes] = {}
+        self._changed = asyncio.Event()
+
+    def _frame(self, event: str) -> bytes:
+        # Serialize each value at most once, and only when a stream reads it
+        frame = self._frames.get(event)
+        if frame is None:
+            frame = self._frames[event] = _format_event(event, self._latest[event][1])
+        return frame
+
+    def _pending(self, seen: int) -> list[tuple[int, bytes]]:
+        """Frames published after sequence number ``seen``, oldest first."""
+        return sorted(
+            (seq, self._frame(event))
+            for event, (seq, _) in self._latest.items()
+            if seq > seen
+        )
+
+    def publish(self, event: str, data: dict) -> None:
+        self._seq += 1
+        self._latest[event] = (self._seq, data)
+        self._frames.pop(event, None)
+        # Wake every waiting stream; later waiters block on a fresh event
+        changed, self._changed = self._changed, asyncio.Event()
+        changed.set()
+
+    def stream(self) -> StreamingResponse:
+        async def event_generator() -> AsyncGenerator[bytes, None]:
+            # Starting from 0 replays the latest level to the new subscriber
+            seen = 0
+            # Initial comment to open the stream
+            yield b": connected\n\n"
+            while True:
+                # Grab the wake-up event before checking, so a publish in
+                # between is never missed
+                changed = self._changed
+                pending = self._pending(seen)
+                if pending:
+                    seen = pending[-1][0]
+                    for _, frame in pending:
+                        yield frame
+                    continue
+                try:
+                    await asyncio.wait_for(changed.wait(), KEEPALIVE_INTERVAL)
+                except asyncio.TimeoutError:
+                    yield _KEEPALIVE_FRAME
+
+        return StreamingResponse(
+            event_generator(), media_type="text/event-stream", headers=_SSE_HEADERS
+        )
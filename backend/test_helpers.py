@@ -1,4 +1,3 @@
-import copy
 import sys
 from pathlib import Path
 
@@ -94,7 +93,7 @@ def test_clear_pentomino_cluster_fails_if_not_exactly_five():
     for r, c in coords:
         board[r][c] = letter
 
-    snapshot = copy.deepcopy(board)
+    snapshot = [row[:] for row in board]
 
     cleared = _clear_pentomino_cluster(board, 1, 1)
 
@@ -106,7 +105,7 @@ def test_clear_pentomino_cluster_fails_if_start_not_letter():
     board = _make_board()
     board[0][0] = "-"
 
-    snapshot = copy.deepcopy(board)
+    snapshot = [row[:] for row in board]
 
     cleared = _clear_pentomino_cluster(board, 0, 0)
 
@@ -121,7 +120,7 @@ def test_clear_pentomino_cluster_fails_if_cluster_too_large():
     for r, c in coords:
         board[r][c] = letter
 
-    snapshot = copy.deepcopy(board)
+    snapshot = [row[:] for row in board]
 
     cleared = _clear_pentomino_cluster(board, 1, 1)
 
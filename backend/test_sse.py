@@ -0,0 +1,72 @@
+import asyncio
+
+import sse  # type: ignore
+from jsonio import loads  # type: ignore
+from sse import SSEBroker  # type: ignore
+
+
+def _data(frame: bytes) -> dict:
+    header, data = frame.rstrip(b"\n").split(b"\n")
+    assert header == b"event: level"
+    return loads(data[len(b"data: "):])
+
+
+def _run(scenario) -> None:
+    async def main():
+        broker = SSEBroker()
+        stream = broker.stream().body_iterator
+        try:
+            await scenario(broker, stream)
+        finally:
+            await stream.aclose()
+
+    asyncio.run(main())
+
+
+def test_stream_headers():
+    response = SSEBroker().stream()
+
+    assert response.media_type == "text/event-stream"
+    assert response.headers["cache-control"] == "no-cache"
+    assert response.headers["x-accel-buffering"] == "no"
+
+
+def test_stream_replays_latest_level_on_connect():
+    async def scenario(broker, stream):
+        broker.publish("level", {"level_id": "1"})
+        broker.publish("level", {"level_id": "2"})
+
+        assert await stream.__anext__() == b": connected\n\n"
+        assert _data(await stream.__anext__()) == {"level_id": "2"}
+
+    _run(scenario)
+
+
+def test_stream_coalesces_publishes_before_a_read():
+    async def scenario(broker, stream):
+        await stream.__anext__()
+        pending = asyncio.ensure_future(stream.__anext__())
+        await asyncio.sleep(0)
+
+        broker.publish("level", {"level_id": "1"})
+        broker.publish("level", {"level_id": "2"})
+
+        assert _data(await pending) == {"level_id": "2"}
+        # Nothing else is queued behind the coalesced frame
+        follow_up = asyncio.ensure_future(stream.__anext__())
+        await asyncio.sleep(0)
+        assert not follow_up.done()
+        follow_up.cancel()
+        await asyncio.gather(follow_up, return_exceptions=True)
+
+    _run(scenario)
+
+
+def test_stream_sends_ping_when_idle(monkeypatch):
+    monkeypatch.setattr(sse, "KEEPALIVE_INTERVAL", 0.01)
+
+    async def scenario(broker, stream):
+        await stream.__anext__()
+        assert await stream.__anext__() == b": ping\n\n"
+
+    _run(scenario)